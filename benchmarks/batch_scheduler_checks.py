@@ -0,0 +1,119 @@
+# Behavior checks for the token-aware scheduler
+# Run from the repository root: python benchmarks/batch_scheduler_checks.py
+#
+# Checks window packing, the rate limiter (with a fake clock) and the
+# splitting of color batches and summary chunks. Nothing is sent: token
+# counts come from the local estimate or from a fake exact counter.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import outils.batch_scheduler as batch_scheduler
+from outils.batch_scheduler import TokenRateLimiter, pack_windows, plan_color_matching, plan_summary
+
+REFERENCE_COLORS = [{"name": f"reference color {i}", "hex": f"#{i:06X}"} for i in range(40)]
+
+def with_exact_counter(count_tokens):
+    """
+    Make exact=True use count_tokens instead of the API.
+    """
+    batch_scheduler.make_token_counter = (
+        lambda model_name, exact=False: count_tokens if exact else batch_scheduler.estimate_tokens)
+
+def check_pack_windows():
+    jobs = [{"id": i, "tokens": tokens} for i, tokens in enumerate([20, 60, 10, 50, 30, 40])]
+    windows = pack_windows(jobs, tpm=100, rpm=3)
+    assert sorted(job["id"] for window in windows for job in window) == list(range(len(jobs)))
+    for window in windows:
+        assert sum(job["tokens"] for job in window) <= 100 and len(window) <= 3, window
+    # 210 tokens need at least 3 windows of 100; biggest jobs first, small ones fill the gaps
+    assert [[job["tokens"] for job in window] for window in windows] == [[60, 40], [50, 30, 20], [10]]
+    # The request limit also closes windows
+    assert [len(window) for window in pack_windows(jobs, tpm=1000, rpm=4)] == [4, 2]
+    # With a request limit of 1, every job gets its own window
+    assert len(pack_windows(jobs, tpm=1000, rpm=1)) == len(jobs)
+    # A job bigger than the TPM limit still gets a window of its own
+    assert pack_windows([{"tokens": 500}, {"tokens": 10}], tpm=100, rpm=5) == [[{"tokens": 500}], [{"tokens": 10}]]
+
+def check_rate_limiter():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = TokenRateLimiter(tpm=100, rpm=2, clock=lambda: now[0], sleep=sleep)
+    limiter.wait(60)
+    limiter.wait(30)
+    assert sleeps == []
+    # Third request of the minute: waits for the first one to leave the window
+    limiter.wait(10)
+    assert sleeps == [60] and now[0] == 60
+    now[0] = 70
+    # 10 + 95 tokens exceed the TPM limit: waits until the request sent at 60 is a minute old
+    limiter.wait(95)
+    assert sleeps == [60, 50] and now[0] == 120
+    # A job over the TPM limit is sent alone instead of waiting forever
+    now[0] = 500
+    limiter.wait(1000)
+    assert sleeps == [60, 50]
+
+def check_color_batches():
+    color_names = [f"target color {i}" for i in range(30)] + ["x" * 2000]
+
+    with_exact_counter(batch_scheduler.estimate_tokens)
+    overhead = batch_scheduler.estimate_tokens(batch_scheduler.create_batch_color_matching_prompt([], REFERENCE_COLORS))
+    plan = plan_color_matching(color_names, REFERENCE_COLORS, tpm=overhead + 300, rpm=2, max_batch_size=8)
+    budget = overhead + 300
+    # The long name can't fit any request; every other color is in exactly one batch
+    assert [refused["name"] for refused in plan["refused"]] == ["x" * 2000]
+    assert [color for job in plan["jobs"] for color in job["colors"]] == color_names[:-1]
+    for job in plan["jobs"]:
+        assert len(job["colors"]) <= 8 and job["tokens"] <= budget, job
+    for window in plan["windows"]:
+        assert sum(job["tokens"] for job in window) <= budget and len(window) <= 2
+
+    # Counted exactly, prompts are three times their estimate: batches are split until they fit
+    with_exact_counter(lambda text: 3 * batch_scheduler.estimate_tokens(text) - 2 * overhead)
+    exact_plan = plan_color_matching(color_names[:-1], REFERENCE_COLORS, tpm=budget, rpm=2,
+                                     max_batch_size=8, exact=True)
+    assert len(exact_plan["jobs"]) > len(plan["jobs"])
+    assert [color for job in exact_plan["jobs"] for color in job["colors"]] == color_names[:-1]
+    for job in exact_plan["jobs"]:
+        assert job["tokens"] <= budget, job
+
+def check_summary_chunks():
+    # About one token per character, as for CJK text, while chunks are cut at four characters per token
+    content = "\n\n".join("色" * 300 for _ in range(200))
+    with_exact_counter(len)
+    plan = plan_summary(content, exact=True)
+    clean_jobs = [job for job in plan["jobs"] if job["step"] == "clean"]
+    assert not plan["refused"] and plan["chunks"] == len(clean_jobs)
+    output_limit = plan["limits"]["output"]
+    for job in clean_jobs:
+        # The whole chunk fits the clean output, nothing is cut off
+        assert job["output_tokens"] == job["input_tokens"] <= output_limit, job["input_tokens"]
+    assert "".join(job["text"] for job in clean_jobs).replace("\n", "") == content.replace("\n", "")
+
+    # A chunk that can't be split small enough refuses the article
+    with_exact_counter(lambda text: 10 ** 9)
+    plan = plan_summary("some text", exact=True)
+    assert len(plan["refused"]) == 1 and not plan["jobs"]
+
+def main() -> int:
+    make_token_counter = batch_scheduler.make_token_counter
+    checks = [check_pack_windows, check_rate_limiter, check_color_batches, check_summary_chunks]
+    try:
+        for check in checks:
+            check()
+            print(f"ok  {check.__name__}")
+    finally:
+        batch_scheduler.make_token_counter = make_token_counter
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# Throughput benchmark for the local color similarity index
+# Run from the repository root: python benchmarks/color_index_benchmark.py
+#
+# Builds a reference of distinct modifier + color names and scores a batch of
+# distinct target names (synonyms, typos, unknown words). Every target is
+# different, so the rate is not helped by the cache of repeated names.
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outils.color_index import COLOR_SYNONYM_GROUPS, LOOSE_COLOR_SYNONYM_GROUPS, ColorIndex, split_by_similarity
+
+MODIFIERS = ["light", "dark", "pale", "deep", "bright", "soft", "dusty", "neon", "vintage", "washed", "heather",
+             "muted", "warm", "cool", "rich", "smoky", "faded", "metallic", "pastel", "electric"]
+EXTRA_WORDS = ["oxford", "stone", "denim", "rust", "storm", "forest", "ocean", "desert", "berry", "earth",
+               "sky", "sea", "clay", "smoke", "fog", "dune", "moon", "ink", "lagoon", "pine",
+               "marl", "melange", "jersey", "twill", "linen", "suede", "velvet", "satin", "canvas", "tweed",
+               "autumn", "winter", "spring", "summer", "dawn", "dusk", "midnight", "sunset", "harbor", "meadow",
+               "glacier", "volcano", "canyon", "prairie", "tundra", "jungle", "reef", "orchid", "peony", "tulip",
+               "graphite", "granite", "marble", "pebble", "shell", "pearl", "copper", "bronze", "brass", "steel",
+               "iron", "cedar", "maple", "walnut", "birch", "willow", "fern", "ivy", "lotus", "poppy"]
+
+def make_typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice("aeioulnrst") + name[i + 1:]
+
+def distinct_names(count: int, first_words, second_words, rng: random.Random, typo_rate: float = 0.0):
+    pairs = [f"{a} {b}" for a, b in itertools.product(first_words, second_words) if a != b]
+    if count > len(pairs):
+        raise ValueError(f"only {len(pairs)} distinct names available, asked for {count}")
+    names = []
+    for name in rng.sample(pairs, count):
+        names.append(make_typo(name, rng) if rng.random() < typo_rate else name)
+    return list(dict.fromkeys(names))
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--references", type=int, default=1000)
+    parser.add_argument("--targets", type=int, default=30000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    groups = COLOR_SYNONYM_GROUPS + LOOSE_COLOR_SYNONYM_GROUPS
+    colors = [name for group in groups for name in group if " " not in name]
+    reference_names = distinct_names(args.references, MODIFIERS + EXTRA_WORDS,
+                                     [group[0] for group in LOOSE_COLOR_SYNONYM_GROUPS], rng)
+    reference_colors = [{"name": name, "hex": f"#{rng.randrange(0x1000000):06X}"} for name in reference_names]
+    vocabulary = list(dict.fromkeys(MODIFIERS + EXTRA_WORDS + colors))
+    targets = distinct_names(args.targets, vocabulary, vocabulary, rng, typo_rate=0.1)
+
+    start = time.perf_counter()
+    index = ColorIndex(reference_colors)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = split_by_similarity(targets, index)
+    search_time = time.perf_counter() - start
+
+    print(f"Index: {len(reference_colors)} distinct reference names built in {build_time * 1000:.1f} ms")
+    print(f"Search: {len(targets)} distinct names in {search_time * 1000:.1f} ms "
+          f"-> {len(targets) / search_time:,.0f} unique names/s")
+    print(f"Accepted locally: {len(result['matched'])}, sent to the LLM: {len(result['candidates'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# Behavior checks for the local color similarity index
+# Run from the repository root: python benchmarks/color_index_checks.py
+#
+# ColorIndex.search adds per-token score rows and computes norms by hand for
+# speed; these checks compare it with a plain cosine similarity of the full
+# name vectors, and check the acceptance rules of split_by_similarity.
+
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outils.color_index import (LOOSE_SYNONYM_WEIGHT, SYNONYM_WEIGHT, ColorIndex, expand_synonyms,
+                                normalize_color_name, split_by_similarity)
+
+WORDS = ["light", "dark", "pale", "navy", "blue", "grey", "gray", "green", "red", "burgundy", "bordeaux",
+         "oxblood", "yellow", "mustard", "beige", "khaki", "sand", "ecru", "cream", "black", "white", "stone",
+         "mint", "wine", "off", "heather", "denim"]
+
+def brute_force_scores(index: ColorIndex, name: str):
+    """
+    Best cosine similarity of a name and its synonym variants with every reference.
+    """
+    name = normalize_color_name(name)
+    variants = [(name, 1.0)]
+    variants += [(variant, SYNONYM_WEIGHT) for variant in expand_synonyms(name, index.synonyms)]
+    variants += [(variant, LOOSE_SYNONYM_WEIGHT) for variant in expand_synonyms(name, index.loose_synonyms)]
+    vectors = index.vectorize([variant for variant, _ in variants])
+    weights = np.array([weight for _, weight in variants], dtype=np.float32)
+    return ((vectors @ index.matrix.T) * weights[:, None]).max(axis=0)
+
+def check_search_matches_brute_force():
+    rng = random.Random(0)
+    reference_names = list(dict.fromkeys(" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(300)))
+    index = ColorIndex([{"name": name.title(), "hex": f"#{i:06X}"} for i, name in enumerate(reference_names)])
+
+    targets = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) for _ in range(400)]
+    targets += ["Navy  Blue!", "navi blue", "Écru", "", "zzz", "blue blue", "grey blue", "blue grey"]
+    # Small chunks so that several chunks and their per-chunk token rows are exercised
+    for target, ranked in zip(targets, index.search(targets, top_k=5, chunk_size=64)):
+        expected = brute_force_scores(index, target)
+        scores = [candidate["score"] for candidate in ranked]
+        assert scores == sorted(scores, reverse=True), (target, scores)
+        assert abs(scores[0] - expected.max()) < 1e-3, (target, scores[0], expected.max())
+        for candidate in ranked:
+            position = reference_names.index(normalize_color_name(candidate["name"]))
+            assert abs(candidate["score"] - expected[position]) < 1e-3, (target, candidate, expected[position])
+
+def check_word_order():
+    index = ColorIndex([{"name": "Blue Grey", "hex": "#6699CC"}, {"name": "Blue Green", "hex": "#0D98BA"}])
+    grey_blue, blue_grey = index.search(["Grey Blue", "blue grey"])
+    assert blue_grey[0]["score"] == 1.0
+    assert grey_blue[0]["score"] < 0.9, grey_blue
+    assert "Grey Blue" not in split_by_similarity(["Grey Blue"], index)["matched"]
+
+def check_split_by_similarity():
+    index = ColorIndex([{"name": "Burgundy", "hex": "#800020"}, {"name": "Yellow", "hex": "#FFFF00"},
+                        {"name": "Beige", "hex": "#F5F5DC"}, {"name": "Khaki", "hex": "#C3B091"},
+                        {"name": "Navy Blue", "hex": "#000080"}, {"name": "Navy", "hex": "#000080"},
+                        {"name": "Storm Blue", "hex": "#4F666A"}, {"name": "Storm Blues", "hex": "#4F6670"}])
+    result = split_by_similarity(["Bordeaux", "navy", "mustard", "sand", "Storm Blue", "Storm Bleu"], index)
+    # Same-color synonyms and exact names are accepted, also when several references share the hex code
+    assert set(result["matched"]) == {"Bordeaux", "navy", "Storm Blue"}, result["matched"]
+    assert result["matched"]["Bordeaux"]["hex_code"] == "#800020"
+    # Loose synonyms and ties between different colors are left to the LLM with their candidates
+    assert [candidate["name"] for candidate in result["candidates"]["mustard"]] == ["Yellow"]
+    assert {candidate["name"] for candidate in result["candidates"]["sand"][:2]} == {"Beige", "Khaki"}
+    assert result["candidates"]["Storm Bleu"]
+
+def check_normalization():
+    assert normalize_color_name("Écru") == "ecru"
+    assert normalize_color_name("Crème  Brûlée") == "creme brulee"
+    assert normalize_color_name("NAVY-blue_2") == "navy blue 2"
+
+def main() -> int:
+    checks = [check_search_matches_brute_force, check_word_order, check_split_by_similarity, check_normalization]
+    for check in checks:
+        check()
+        print(f"ok  {check.__name__}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
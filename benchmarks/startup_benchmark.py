@@ -0,0 +1,80 @@
+# Startup benchmark for the `ai-prompt` CLI
+# Run from the repository root: python benchmarks/startup_benchmark.py
+#
+# For every subcommand it imports the CLI and the outils modules the
+# subcommand uses under `python -X importtime`, then reports the total import
+# time and fails if a heavy dependency was loaded at import time.
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# outils modules each subcommand imports before doing any work
+SUBCOMMAND_MODULES: Dict[str, List[str]] = {
+    "post": ["outils.post_outils"],
+    "summarize": ["outils.batch_scheduler", "outils.doc_manage_outils"],
+    "match-colors": ["outils.batch_scheduler"],
+    "compile-reference": ["outils.llm_color_matcher"],
+    "serve": ["outils.match_service"],
+}
+
+# Dependencies that must only be imported when a subcommand actually runs
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl", "google.generativeai", "dotenv", "requests"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def profile_imports(modules: List[str]) -> Tuple[float, List[str]]:
+    """
+    Import the CLI and the given modules under -X importtime.
+    Returns the cumulative import time in ms and the list of imported modules.
+    """
+    code = "; ".join(f"import {module}" for module in ["outils.cli"] + modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+    total_us = 0
+    imported = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        imported.append(name.strip())
+    return total_us / 1000, imported
+
+def time_help(subcommand: str, runs: int = 5) -> float:
+    """
+    Median wall-clock time in ms of `python -m outils.cli <subcommand> --help`.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "outils.cli", subcommand, "--help"],
+                       cwd=REPO_ROOT, capture_output=True, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main() -> int:
+    print(f"{'subcommand':<20}{'imports [ms]':>14}{'--help [ms]':>14}  heavy imports")
+    failed = False
+    for subcommand, modules in SUBCOMMAND_MODULES.items():
+        import_ms, imported = profile_imports(modules)
+        help_ms = time_help(subcommand)
+        heavy = [name for name in imported
+                 if any(name == module or name.startswith(module + ".") for module in HEAVY_MODULES)]
+        if heavy:
+            failed = True
+        print(f"{subcommand:<20}{import_ms:>14.1f}{help_ms:>14.1f}  {', '.join(heavy) or '-'}")
+
+    if failed:
+        print("\n❌ Heavy dependencies are imported at startup")
+        return 1
+    print("\n✅ No heavy dependency imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,13 @@
-from dotenv import load_dotenv
-import google.generativeai as genai
-import os
+from outils.cli import setup_environment
 from outils.prompt_outils import clean_content, generate_summary, format_text_to_markdown
 from outils.doc_manage_outils import get_content_from_url, generate_document
 
-load_dotenv()
-
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
 def main():
     """
     Main function to get user url, generate an X post with the content of the url, and print it.
     """
+    setup_environment()
+
     print("Hello from first-python! Let's create a summary with a content from a url.")
     user_url = input("What is the url of the content you want to summarize? ")
 
@@ -0,0 +1,436 @@
+import math
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from outils.llm_color_matcher import create_batch_color_matching_prompt, format_candidates
+
+# Token estimation and scheduling for the color-matching and summarization
+# paths. Every job is sized before anything is sent, jobs that don't fit the
+# model context are split (text) or refused (colors), and the work is packed
+# into batches and one-minute windows that stay under the TPM limit. A
+# projected cost and duration is printed before the run starts.
+
+# Limits and prices (USD per 1M tokens) used when nothing else is given.
+# Check the current Gemini pricing/quota page and override with --tpm/--rpm.
+MODEL_LIMITS: Dict[str, Dict[str, float]] = {
+    "gemini-1.5-flash": {"context": 1_048_576, "output": 8_192, "tpm": 1_000_000, "rpm": 15,
+                         "input_price": 0.075, "output_price": 0.30},
+    "gemini-2.0-flash": {"context": 1_048_576, "output": 8_192, "tpm": 1_000_000, "rpm": 15,
+                         "input_price": 0.10, "output_price": 0.40},
+    "gemini-2.5-flash-lite": {"context": 1_048_576, "output": 65_536, "tpm": 250_000, "rpm": 15,
+                              "input_price": 0.10, "output_price": 0.40},
+}
+
+# Returned by process_scheduled_color_matching when the projection was printed
+# but, as asked, nothing was sent or written
+DRY_RUN = "dry-run"
+
+CHARS_PER_TOKEN = 4
+# Estimated output tokens for one color in the batch JSON response
+OUTPUT_TOKENS_PER_COLOR = 40
+# Estimated output tokens of a summary
+SUMMARY_OUTPUT_TOKENS = 600
+
+def get_model_limits(model_name: str, tpm: Optional[int] = None, rpm: Optional[int] = None) -> Dict[str, float]:
+    """
+    Limits of a model, with optional TPM/RPM overrides.
+    """
+    limits = dict(MODEL_LIMITS.get(model_name, MODEL_LIMITS["gemini-2.0-flash"]))
+    if tpm:
+        limits["tpm"] = tpm
+    if rpm:
+        limits["rpm"] = rpm
+    return limits
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate (about 4 characters per token for English text).
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def make_token_counter(model_name: str, exact: bool = False) -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a prompt.
+    With exact=True the SDK's count_tokens is used, falling back to the local estimate on error.
+    """
+    if not exact:
+        return estimate_tokens
+
+    from outils.prompt_outils import get_model
+
+    def count_tokens(text: str) -> int:
+        try:
+            return get_model(model_name).count_tokens(text).total_tokens
+        except Exception as e:
+            print(f"Error counting tokens, using local estimate: {e}")
+            return estimate_tokens(text)
+
+    return count_tokens
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens (estimated), on paragraph or line boundaries when possible.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    current = ""
+    for separator_part in text.split("\n\n"):
+        parts = [separator_part]
+        if len(separator_part) > max_chars:
+            parts = separator_part.split("\n")
+        for part in parts:
+            while len(part) > max_chars:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(part[:max_chars])
+                part = part[max_chars:]
+            if current and len(current) + len(part) + 2 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{part}" if current else part
+    if current:
+        chunks.append(current)
+    return chunks
+
+def pack_windows(jobs: List[Dict], tpm: int, rpm: int) -> List[List[Dict]]:
+    """
+    Pack jobs into one-minute windows of at most tpm tokens and rpm requests.
+    First-fit decreasing: the biggest jobs are placed first and small ones fill the gaps,
+    so the run needs as few windows (minutes) as possible.
+    """
+    windows = []
+    for job in sorted(jobs, key=lambda job: job["tokens"], reverse=True):
+        for window in windows:
+            if (sum(j["tokens"] for j in window) + job["tokens"] <= tpm and len(window) < rpm):
+                window.append(job)
+                break
+        else:
+            windows.append([job])
+    return windows
+
+def plan_color_matching(color_names: List[str], reference_colors: List[Dict[str, str]],
+                        model_name: str = "gemini-1.5-flash", tpm: Optional[int] = None, rpm: Optional[int] = None,
+                        max_batch_size: int = 50, exact: bool = False,
+                        candidates: Optional[Dict[str, List[Dict[str, object]]]] = None) -> Dict:
+    """
+    Pack the color names into batch requests that fit the model context, output limit and TPM budget.
+    The reference list is sent with every request, so bigger batches share it across more colors.
+    Candidates from the local similarity index are sent with their color and counted in its size.
+    With exact=True every assembled batch prompt is counted with the API, and batches that turn
+    out too big are split in two.
+    """
+    limits = get_model_limits(model_name, tpm, rpm)
+    count_tokens = make_token_counter(model_name, exact)
+
+    # The prompt with no target colors is the fixed cost of every request
+    overhead = count_tokens(create_batch_color_matching_prompt([], reference_colors))
+    budget = min(limits["context"] - limits["output"], limits["tpm"])
+    max_colors = min(max_batch_size, int(limits["output"] // OUTPUT_TOKENS_PER_COLOR))
+
+    candidates = candidates or {}
+    plan = {"model": model_name, "limits": limits, "jobs": [], "refused": [], "windows": [],
+            "candidates": candidates}
+    if overhead + OUTPUT_TOKENS_PER_COLOR > budget:
+        for color_name in color_names:
+            plan["refused"].append({"name": color_name, "reason": f"reference prompt ({overhead} tokens) exceeds "
+                                                                  f"the request budget ({budget} tokens)"})
+        return plan
+
+    def add_job(batch: List[str], batch_tokens: int):
+        if exact:
+            batch_tokens = count_tokens(create_batch_color_matching_prompt(batch, reference_colors, candidates))
+            if batch_tokens + OUTPUT_TOKENS_PER_COLOR * len(batch) > budget:
+                if len(batch) == 1:
+                    plan["refused"].append({"name": batch[0], "reason": "color prompt exceeds the request budget"})
+                    return
+                half = len(batch) // 2
+                add_job(batch[:half], 0)
+                add_job(batch[half:], 0)
+                return
+        plan["jobs"].append(make_color_job(batch, batch_tokens))
+
+    batch = []
+    batch_tokens = overhead
+    for color_name in color_names:
+        # json.dumps adds quotes and a separator around each name
+        color_tokens = estimate_tokens(color_name) + 2
+        if candidates.get(color_name):
+            color_tokens += estimate_tokens(f"* \"{color_name}\": {format_candidates(candidates[color_name])}\n")
+        if overhead + color_tokens + OUTPUT_TOKENS_PER_COLOR > budget:
+            plan["refused"].append({"name": color_name, "reason": "color name exceeds the request budget"})
+            continue
+        if batch and (len(batch) >= max_colors or batch_tokens + color_tokens
+                      + OUTPUT_TOKENS_PER_COLOR * (len(batch) + 1) > budget):
+            add_job(batch, batch_tokens)
+            batch, batch_tokens = [], overhead
+        batch.append(color_name)
+        batch_tokens += color_tokens
+    if batch:
+        add_job(batch, batch_tokens)
+
+    plan["windows"] = pack_windows(plan["jobs"], limits["tpm"], limits["rpm"])
+    return plan
+
+def make_color_job(color_names: List[str], input_tokens: int) -> Dict:
+    output_tokens = OUTPUT_TOKENS_PER_COLOR * len(color_names)
+    return {
+        "colors": color_names,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "tokens": input_tokens + output_tokens,
+    }
+
+def plan_summary(content: str, model_name: str = "gemini-2.0-flash", tpm: Optional[int] = None,
+                 rpm: Optional[int] = None, exact: bool = False) -> Dict:
+    """
+    Plan the clean/summarize/format calls of the summarization path.
+    The clean step rewrites its input, so content is split into chunks the output limit can hold;
+    with exact=True chunks counted over that size are split again.
+    The cleaned chunks are summarized in groups that fit one request, then the summaries of those
+    groups, until a single summary is left. Nothing is planned (the article is refused) if even
+    the smallest request can't fit the context and TPM budget, or a chunk can't be split to fit.
+    """
+    limits = get_model_limits(model_name, tpm, rpm)
+    count_tokens = make_token_counter(model_name, exact)
+
+    # Instructions of the prompts in prompt_outils are well under 100 tokens
+    prompt_overhead = 100
+    # Input + output of any single request
+    budget = int(min(limits["context"] - limits["output"], limits["tpm"]))
+    # A clean request outputs about as many tokens as it reads
+    chunk_tokens = int(min(limits["output"], budget / 2)) - prompt_overhead
+    # A summarize request must reduce at least two summaries to one
+    summary_input_tokens = budget - prompt_overhead - SUMMARY_OUTPUT_TOKENS
+
+    plan = {"model": model_name, "limits": limits, "jobs": [], "refused": [], "windows": [], "chunks": 0}
+    if chunk_tokens <= 0 or summary_input_tokens < 2 * SUMMARY_OUTPUT_TOKENS:
+        plan["refused"].append({"name": "article", "reason": f"the request budget ({budget} tokens) can't hold "
+                                                             "a clean or summarize request"})
+        return plan
+
+    clean_jobs = []
+
+    def add_clean_job(chunk: str):
+        # One refused chunk refuses the article, the rest needs no counting
+        if plan["refused"]:
+            return
+        input_tokens = count_tokens(chunk)
+        if input_tokens > chunk_tokens:
+            # Counted with the API, the chunk is bigger than its estimate: split it in halves
+            # (on paragraph or line boundaries when possible) and count the parts again
+            parts = split_text(chunk, max(1, len(chunk) // (2 * CHARS_PER_TOKEN)))
+            if len(parts) < 2:
+                parts = [chunk[:len(chunk) // 2], chunk[len(chunk) // 2:]]
+            if not all(parts):
+                plan["refused"].append({"name": "chunk", "reason": f"'{chunk}' counts {input_tokens} tokens, "
+                                                                   f"over the clean limit ({chunk_tokens} tokens)"})
+                return
+            for part in parts:
+                add_clean_job(part)
+            return
+        input_tokens += prompt_overhead
+        # Cleaned text is at most the size of the input, which fits the output limit
+        clean_jobs.append({"step": "clean", "text": chunk, "input_tokens": input_tokens,
+                           "output_tokens": input_tokens, "tokens": 2 * input_tokens})
+
+    for chunk in split_text(content, chunk_tokens):
+        add_clean_job(chunk)
+    plan["chunks"] = len(clean_jobs)
+    if plan["refused"]:
+        return plan
+
+    plan["jobs"].extend(clean_jobs)
+    # The steps depend on each other, only the jobs of one level can share windows
+    plan["windows"].extend(pack_windows(clean_jobs, limits["tpm"], limits["rpm"]))
+
+    # Summarize consecutive pieces in groups that fit a request, level by level
+    piece_tokens = [job["output_tokens"] for job in clean_jobs]
+    level = 0
+    while True:
+        level_jobs = []
+        group, group_tokens = [], 0
+        for i, tokens in enumerate(piece_tokens):
+            if group and group_tokens + tokens > summary_input_tokens:
+                level_jobs.append(make_summary_job(level, group, group_tokens, prompt_overhead))
+                group, group_tokens = [], 0
+            group.append(i)
+            group_tokens += tokens
+        level_jobs.append(make_summary_job(level, group, group_tokens, prompt_overhead))
+
+        plan["jobs"].extend(level_jobs)
+        plan["windows"].extend(pack_windows(level_jobs, limits["tpm"], limits["rpm"]))
+        if len(level_jobs) == 1:
+            break
+        piece_tokens = [job["output_tokens"] for job in level_jobs]
+        level += 1
+
+    format_job = {"step": "format", "input_tokens": SUMMARY_OUTPUT_TOKENS + prompt_overhead,
+                  "output_tokens": SUMMARY_OUTPUT_TOKENS,
+                  "tokens": 2 * SUMMARY_OUTPUT_TOKENS + prompt_overhead}
+    plan["jobs"].append(format_job)
+    plan["windows"].append([format_job])
+    return plan
+
+def make_summary_job(level: int, inputs: List[int], input_tokens: int, prompt_overhead: int) -> Dict:
+    return {
+        "step": "summarize",
+        "level": level,
+        "inputs": inputs,
+        "input_tokens": input_tokens + prompt_overhead,
+        "output_tokens": SUMMARY_OUTPUT_TOKENS,
+        "tokens": input_tokens + prompt_overhead + SUMMARY_OUTPUT_TOKENS,
+    }
+
+def project_plan(plan: Dict) -> Dict[str, float]:
+    """
+    Projected requests, tokens, cost and minimum duration of a plan.
+    """
+    limits = plan["limits"]
+    input_tokens = sum(job["input_tokens"] for job in plan["jobs"])
+    output_tokens = sum(job["output_tokens"] for job in plan["jobs"])
+    requests = len(plan["jobs"])
+    cost = (input_tokens * limits["input_price"] + output_tokens * limits["output_price"]) / 1_000_000
+    # The rate limit allows one window per minute; the last one doesn't need to wait a full minute
+    minutes = max(len(plan.get("windows", [])) - 1, 0)
+    return {
+        "requests": requests,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": cost,
+        "minutes": minutes,
+    }
+
+def print_projection(plan: Dict):
+    projection = project_plan(plan)
+    limits = plan["limits"]
+    print("=== Projected run ===")
+    print(f"Model: {plan['model']} (TPM {int(limits['tpm'])}, RPM {int(limits['rpm'])})")
+    print(f"Requests: {projection['requests']} in {len(plan.get('windows', []))} window(s) of one minute")
+    print(f"Tokens: ~{projection['input_tokens']} input, ~{projection['output_tokens']} output")
+    print(f"Cost: ~${projection['cost']:.4f}")
+    print(f"Time: at least {projection['minutes']} min waiting on rate limits, plus model latency")
+    for refused in plan["refused"]:
+        print(f"Refused '{refused['name']}': {refused['reason']}")
+
+class TokenRateLimiter:
+    """
+    Sliding one-minute window over sent tokens and requests; wait() blocks until a job fits.
+    """
+
+    def __init__(self, tpm: int, rpm: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.tpm = tpm
+        self.rpm = rpm
+        self.clock = clock
+        self.sleep = sleep
+        self._sent = deque()
+
+    def wait(self, tokens: int):
+        while True:
+            now = self.clock()
+            while self._sent and now - self._sent[0][0] >= 60:
+                self._sent.popleft()
+            used = sum(sent_tokens for _, sent_tokens in self._sent)
+            if not self._sent or (used + tokens <= self.tpm and len(self._sent) < self.rpm):
+                self._sent.append((now, tokens))
+                return
+            self.sleep(60 - (now - self._sent[0][0]))
+
+def run_color_matching_plan(plan: Dict, reference_colors: List[Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    """
+    Send the batches of a color matching plan, window by window, under the rate limits.
+    """
+    from outils.llm_color_matcher import match_colors_batch_with_llm
+
+    limits = plan["limits"]
+    limiter = TokenRateLimiter(limits["tpm"], limits["rpm"])
+    results = {}
+    for i, window in enumerate(plan["windows"], 1):
+        for job in window:
+            limiter.wait(job["tokens"])
+            print(f"Window {i}/{len(plan['windows'])}: matching {len(job['colors'])} colors")
+            results.update(match_colors_batch_with_llm(job["colors"], reference_colors, plan["model"],
+                                                       candidates=plan["candidates"]))
+    for refused in plan["refused"]:
+        results[refused["name"]] = {"hex_code": "NO_MATCH", "confidence": "low",
+                                    "reasoning": f"Refused: {refused['reason']}"}
+    return results
+
+def run_summary_plan(plan: Dict) -> str:
+    """
+    Clean each chunk, summarize the cleaned text level by level, then format the summary,
+    under the rate limits.
+    """
+    from outils.prompt_outils import clean_content, generate_summary, format_text_to_markdown, get_model
+
+    limits = plan["limits"]
+    limiter = TokenRateLimiter(limits["tpm"], limits["rpm"])
+    model = get_model(plan["model"])
+
+    pieces = []
+    for job in plan["jobs"]:
+        if job["step"] == "clean":
+            limiter.wait(job["tokens"])
+            pieces.append(clean_content(job["text"], model))
+
+    summary_jobs = [job for job in plan["jobs"] if job["step"] == "summarize"]
+    for level in range(summary_jobs[-1]["level"] + 1):
+        summaries = []
+        for job in summary_jobs:
+            if job["level"] == level:
+                limiter.wait(job["tokens"])
+                summaries.append(generate_summary("\n\n".join(pieces[i] for i in job["inputs"]), model))
+        pieces = summaries
+
+    limiter.wait(plan["jobs"][-1]["tokens"])
+    return format_text_to_markdown(pieces[0], model)
+
+def process_scheduled_color_matching(reference_file: str, target_file: str, output_file: str = "llm_matched_colors.xlsx",
+                                     color_column: str = "Color", hex_column: str = "Hex", model_name: str = "gemini-1.5-flash",
+                                     tpm: Optional[int] = None, rpm: Optional[int] = None, max_batch_size: int = 50,
+                                     exact: bool = False, dry_run: bool = False, similarity_threshold: float = 0.9) -> str:
+    """
+    Color matching with batched requests scheduled under the TPM/RPM limits.
+    Colors the local similarity index matches with a score of at least similarity_threshold
+    are accepted without calling the LLM.
+    Prints the projected cost and time before sending anything.
+    Returns the output file, DRY_RUN after printing the projection of a dry run, or "" on failure.
+    """
+    from outils.color_index import ColorIndex, split_by_similarity
+    from outils.llm_color_matcher import (read_color_reference_file, read_target_document, setup_llm,
+                                          write_matched_colors_file)
+
+    reference_colors = read_color_reference_file(reference_file, color_column, hex_column)
+    if not reference_colors:
+        print("Failed to read reference file. Exiting.")
+        return ""
+
+    target_colors = read_target_document(target_file, color_column)
+    if not target_colors:
+        print("Failed to read target file. Exiting.")
+        return ""
+
+    if exact or not dry_run:
+        try:
+            setup_llm()
+        except Exception as e:
+            print(f"Failed to setup LLM: {e}")
+            return ""
+
+    local = split_by_similarity(target_colors, ColorIndex(reference_colors), similarity_threshold)
+    print(f"Matched {len(local['matched'])} colors locally, {len(local['candidates'])} left for the LLM")
+
+    plan = plan_color_matching(list(local["candidates"]), reference_colors, model_name, tpm, rpm,
+                               max_batch_size, exact, local["candidates"])
+    print_projection(plan)
+    if dry_run:
+        return DRY_RUN
+
+    results = dict(local["matched"])
+    results.update(run_color_matching_plan(plan, reference_colors))
+    return write_matched_colors_file(target_colors, [results[color] for color in target_colors], output_file)
@@ -0,0 +1,203 @@
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+# Only the standard library is imported at module level. Each subcommand
+# imports the outils module it needs (and through it pandas,
+# google.generativeai, requests...) when it runs, so `--help` and quick
+# invocations start fast.
+
+def setup_environment():
+    """
+    Load the .env file and configure Gemini with GOOGLE_API_KEY.
+    """
+    from dotenv import load_dotenv
+    import google.generativeai as genai
+
+    load_dotenv()
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+def run_post(args: argparse.Namespace) -> int:
+    """
+    Generate an X post about a topic.
+    """
+    from outils.post_outils import generate_x_post
+
+    setup_environment()
+    topic = args.topic or input("What should the post be about? ")
+
+    x_post = generate_x_post(topic, args.examples)
+
+    print("\n--- Generated X post ---")
+    print(x_post)
+    print("------------------------")
+    return 0
+
+def run_summarize(args: argparse.Namespace) -> int:
+    """
+    Summarize the content of a url into a markdown document.
+    """
+    from outils.batch_scheduler import plan_summary, print_projection, run_summary_plan
+    from outils.doc_manage_outils import get_content_from_url, generate_document
+
+    setup_environment()
+    url = args.url or input("What is the url of the content you want to summarize? ")
+
+    content = get_content_from_url(url)
+    if not content:
+        return 1
+
+    plan = plan_summary(content, args.model, args.tpm, args.rpm, args.exact_tokens)
+    print_projection(plan)
+    if plan["refused"]:
+        return 1
+    if args.dry_run:
+        return 0
+
+    markdown_content = run_summary_plan(plan)
+    document_path = generate_document(markdown_content)
+
+    print("This is the path of the created document:")
+    print(document_path)
+    return 0
+
+def run_match_colors(args: argparse.Namespace) -> int:
+    """
+    Match the colors of a target Excel file against a reference file.
+    """
+    from dotenv import load_dotenv
+    from outils.batch_scheduler import process_scheduled_color_matching
+
+    load_dotenv()
+    output_path = process_scheduled_color_matching(args.reference, args.target, args.output,
+                                                   args.color_column, args.hex_column, args.model,
+                                                   args.tpm, args.rpm, args.batch_size,
+                                                   args.exact_tokens, args.dry_run, args.similarity_threshold)
+    return 0 if output_path else 1
+
+def run_compile_reference(args: argparse.Namespace) -> int:
+    """
+    Compile a reference Excel file to JSON for fast loading.
+    """
+    from outils.llm_color_matcher import compile_color_reference
+
+    output_path = compile_color_reference(args.reference, args.output,
+                                          args.color_column, args.hex_column)
+    return 0 if output_path else 1
+
+def run_serve(args: argparse.Namespace) -> int:
+    """
+    Run the local match service with the reference colors loaded once.
+    """
+    import asyncio
+    from outils.llm_color_matcher import read_color_reference_file, setup_llm
+    from outils.match_service import MatchService, StubModel, serve
+
+    reference_colors = read_color_reference_file(args.reference, args.color_column, args.hex_column)
+    if not reference_colors:
+        print("Failed to read reference file. Exiting.")
+        return 1
+
+    if args.stub:
+        stub_model = StubModel(args.stub_delay)
+        service = MatchService(reference_colors, lambda model_name: stub_model,
+                               batch_size=args.batch_size, batch_wait=args.batch_wait,
+                               similarity_threshold=args.similarity_threshold)
+    else:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        try:
+            setup_llm()
+        except Exception as e:
+            print(f"Failed to setup LLM: {e}")
+            return 1
+        service = MatchService(reference_colors, batch_size=args.batch_size, batch_wait=args.batch_wait,
+                               similarity_threshold=args.similarity_threshold)
+
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.read_timeout))
+    except KeyboardInterrupt:
+        print("Match service stopped")
+    return 0
+
+def add_scheduler_arguments(parser: argparse.ArgumentParser):
+    """
+    Options of the token-aware scheduler shared by the LLM subcommands.
+    """
+    parser.add_argument("--tpm", type=int, help="tokens per minute limit (default: known limit of the model)")
+    parser.add_argument("--rpm", type=int, help="requests per minute limit (default: known limit of the model)")
+    parser.add_argument("--exact-tokens", action="store_true", help="count prompts with the API instead of estimating "
+                                                                    "(LLM outputs are always estimated)")
+    parser.add_argument("--dry-run", action="store_true", help="print the projected cost and time, send nothing")
+
+def add_similarity_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--similarity-threshold", type=float, default=0.9,
+                        help="accept local similarity matches scoring at least this (0-1) without the LLM; "
+                             "above 1 sends every color to the LLM")
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser with one subparser per command.
+    """
+    parser = argparse.ArgumentParser(prog="ai-prompt", description="Prompt engineering tools built on Gemini.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    post = subparsers.add_parser("post", help="generate an X post about a topic")
+    post.add_argument("topic", nargs="?", help="topic of the post (asked interactively if omitted)")
+    post.add_argument("--examples", default="post-examples.json", help="JSON file with example posts")
+    post.set_defaults(func=run_post)
+
+    summarize = subparsers.add_parser("summarize", help="summarize a web page into summary.md")
+    summarize.add_argument("url", nargs="?", help="url of the content (asked interactively if omitted)")
+    summarize.add_argument("--model", default="gemini-2.0-flash")
+    add_scheduler_arguments(summarize)
+    summarize.set_defaults(func=run_summarize)
+
+    match_colors = subparsers.add_parser("match-colors", help="match color names to hex codes with the LLM")
+    match_colors.add_argument("reference", help="reference colors (.xlsx, or .json from compile-reference)")
+    match_colors.add_argument("target", help="Excel file with the color names to match")
+    match_colors.add_argument("-o", "--output", default="llm_matched_colors.xlsx", help="output Excel file")
+    match_colors.add_argument("--color-column", default="Color")
+    match_colors.add_argument("--hex-column", default="Hex")
+    match_colors.add_argument("--model", default="gemini-1.5-flash")
+    match_colors.add_argument("--batch-size", type=int, default=50, help="max colors sent in one LLM call")
+    add_similarity_argument(match_colors)
+    add_scheduler_arguments(match_colors)
+    match_colors.set_defaults(func=run_match_colors)
+
+    compile_reference = subparsers.add_parser("compile-reference", help="compile a reference Excel file to JSON")
+    compile_reference.add_argument("reference", help="reference colors Excel file")
+    compile_reference.add_argument("-o", "--output", default="color_reference.json", help="output JSON file")
+    compile_reference.add_argument("--color-column", default="Color")
+    compile_reference.add_argument("--hex-column", default="Hex")
+    compile_reference.set_defaults(func=run_compile_reference)
+
+    serve = subparsers.add_parser("serve", help="run the local match service")
+    serve.add_argument("reference", help="reference colors (.xlsx, or .json from compile-reference)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--batch-size", type=int, default=16, help="max colors sent in one LLM call")
+    serve.add_argument("--batch-wait", type=float, default=0.02, help="seconds to wait for a batch to fill")
+    serve.add_argument("--read-timeout", type=float, default=10.0, help="seconds to receive a request before "
+                                                                        "answering 400")
+    add_similarity_argument(serve)
+    serve.add_argument("--color-column", default="Color")
+    serve.add_argument("--hex-column", default="Hex")
+    serve.add_argument("--stub", action="store_true", help="use an offline stub instead of Gemini")
+    serve.add_argument("--stub-delay", type=float, default=0.0, help="simulated latency of the stub, in seconds")
+    serve.set_defaults(func=run_serve)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of the `ai-prompt` command.
+    """
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+import re
+import unicodedata
+import zlib
+from typing import Dict, List, Optional
+
+# Offline similarity search over the reference color names. Names are
+# embedded as hashed character 3-gram + word vectors and ranked by cosine
+# similarity, vectorized with NumPy. A small synonym lexicon
+# covers names that share no letters ("bordeaux" / "burgundy"). numpy is
+# imported when an index is built, like pandas in llm_color_matcher.
+
+# Names of the same color (spelling variants, translations). A query containing
+# one of them is also scored with the name replaced by each other member of its
+# group that appears in the reference names.
+COLOR_SYNONYM_GROUPS: List[List[str]] = [
+    ["grey", "gray"],
+    ["burgundy", "bordeaux"],
+    ["wine", "wine red"],
+    ["fuchsia", "magenta"],
+    ["aqua", "cyan"],
+    ["navy", "navy blue"],
+    ["aubergine", "eggplant"],
+    ["lilac", "lila"],
+    ["mint", "mint green"],
+    ["white", "optic white"],
+    ["black", "jet black"],
+]
+
+# Names of related shades ("oxblood" / "burgundy", "mustard" / "yellow"). They
+# rank candidates for the LLM but score below the default threshold, so they are
+# never accepted locally on their own.
+LOOSE_COLOR_SYNONYM_GROUPS: List[List[str]] = [
+    ["burgundy", "oxblood", "wine", "claret", "merlot"],
+    ["maroon", "dark red", "brick red"],
+    ["red", "scarlet", "crimson", "vermilion", "cherry"],
+    ["pink", "rose", "blush"],
+    ["fuchsia", "hot pink"],
+    ["orange", "tangerine", "pumpkin"],
+    ["coral", "salmon", "peach"],
+    ["yellow", "lemon", "canary", "mustard"],
+    ["gold", "golden", "amber"],
+    ["beige", "sand", "tan", "khaki", "camel", "nude"],
+    ["cream", "ivory", "ecru", "off white", "vanilla", "bone"],
+    ["white", "snow"],
+    ["brown", "chocolate", "cocoa", "mocha", "espresso", "coffee"],
+    ["green", "emerald", "kelly green"],
+    ["olive", "khaki green", "army green", "moss"],
+    ["mint", "pistachio", "sage"],
+    ["teal", "petrol", "dark cyan"],
+    ["turquoise", "aqua"],
+    ["blue", "cobalt", "royal blue", "azure"],
+    ["navy", "dark blue", "midnight blue", "marine"],
+    ["light blue", "sky blue", "baby blue", "powder blue"],
+    ["purple", "violet", "plum", "aubergine"],
+    ["lilac", "lavender", "mauve"],
+    ["grey", "charcoal", "slate", "anthracite", "graphite"],
+    ["silver", "light grey", "ash"],
+    ["black", "ebony", "onyx"],
+]
+
+# Score multipliers for a match found through a synonym instead of the name itself
+SYNONYM_WEIGHT = 0.95
+LOOSE_SYNONYM_WEIGHT = 0.85
+# Weight of whole-word and adjacent word pair features relative to character 3-grams
+WORD_WEIGHT = 2.0
+PAIR_WEIGHT = 2.0
+
+def normalize_color_name(name: str) -> str:
+    """
+    Lowercase, drop accents and keep only letters and digits, separated by single spaces.
+    """
+    name = name.lower()
+    if not name.isascii():
+        name = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[^\W_]+", name))
+
+def build_synonym_lookup(groups: List[List[str]]) -> Dict[str, List[str]]:
+    """
+    Map every name of the lexicon to the other names of its groups.
+    """
+    lookup: Dict[str, List[str]] = {}
+    for group in groups:
+        group = [normalize_color_name(name) for name in group]
+        for name in group:
+            lookup.setdefault(name, []).extend(other for other in group if other != name)
+    return lookup
+
+def expand_synonyms(name: str, lookup: Dict[str, List[str]], max_variants: int = 16) -> List[str]:
+    """
+    Variants of a normalized name with each lexicon phrase it contains replaced by its synonyms.
+    """
+    words = name.split()
+    variants = []
+    # Lexicon phrases are at most three words long
+    for length in range(1, 4):
+        for i in range(len(words) - length + 1):
+            for synonym in lookup.get(" ".join(words[i:i + length]), []):
+                variant = " ".join(words[:i] + [synonym] + words[i + length:])
+                if variant != name and variant not in variants:
+                    variants.append(variant)
+    return variants[:max_variants]
+
+def word_features(word: str) -> Dict[int, float]:
+    """
+    Hashed features of one word: its character 3-grams (with word boundaries) and the word itself.
+    """
+    features: Dict[int, float] = {}
+    padded = f" {word} "
+    for i in range(len(padded) - 2):
+        bucket = zlib.crc32(padded[i:i + 3].encode("utf-8"))
+        features[bucket] = features.get(bucket, 0.0) + 1.0
+    bucket = zlib.crc32(f"w:{word}".encode("utf-8"))
+    features[bucket] = features.get(bucket, 0.0) + WORD_WEIGHT
+    return features
+
+def name_tokens(name: str) -> List[str]:
+    """
+    Tokens of a normalized name: its words, then its adjacent word pairs ("grey blue").
+    Pairs make the vector depend on word order, so "grey blue" and "blue grey" differ.
+    """
+    words = name.split()
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+def token_features(token: str) -> Dict[int, float]:
+    """
+    Hashed features of one token: a word's features, or a single feature for a word pair.
+    """
+    if " " in token:
+        return {zlib.crc32(f"p:{token}".encode("utf-8")): PAIR_WEIGHT}
+    return word_features(token)
+
+class ColorIndex:
+    """
+    Cosine similarity index over the reference color names.
+
+    A name's vector is the sum of its token vectors (words and adjacent word
+    pairs), so its dot product with the references is the sum of per-token score
+    rows. Score rows of the reference tokens and lexicon words are computed once;
+    other tokens once per search chunk. Names and their synonym variants are then
+    scored by adding a few rows instead of a full matrix product each.
+    """
+
+    def __init__(self, reference_colors: List[Dict[str, str]], dimensions: int = 2048,
+                 synonym_groups: Optional[List[List[str]]] = None,
+                 loose_synonym_groups: Optional[List[List[str]]] = None):
+        import numpy as np
+
+        self.reference_colors = reference_colors
+        self.dimensions = dimensions
+        self._features: Dict[str, Dict[int, float]] = {}
+        self._names = [color["name"] for color in reference_colors]
+        self._hexes = [color["hex"] for color in reference_colors]
+
+        names = [normalize_color_name(name) for name in self._names]
+        self.matrix = self.vectorize(names)
+        # Reference vectors by feature column, for sparse products
+        self._columns = np.ascontiguousarray(self.matrix.T)
+        self._used_columns = (self.matrix != 0).any(axis=0)
+
+        # Only synonyms made of words of the reference names can improve a score
+        vocabulary = {word for name in names for word in name.split()}
+        lexicon_words = set()
+        self.synonyms, self.loose_synonyms = {}, {}
+        for synonyms, groups in ((self.synonyms, COLOR_SYNONYM_GROUPS if synonym_groups is None else synonym_groups),
+                                 (self.loose_synonyms, LOOSE_COLOR_SYNONYM_GROUPS if loose_synonym_groups is None
+                                  else loose_synonym_groups)):
+            for phrase, others in build_synonym_lookup(groups).items():
+                lexicon_words.update(phrase.split())
+                useful = [synonym for synonym in others if set(synonym.split()) <= vocabulary]
+                if useful:
+                    synonyms[phrase] = useful
+        # Names without any of these words have no synonym variant
+        self._synonym_words = {word for phrase in list(self.synonyms) + list(self.loose_synonyms)
+                               for word in phrase.split()}
+
+        # Score rows of the known tokens, followed by an all-zero row that pads shorter names
+        known_tokens = sorted({token for name in names for token in name_tokens(name)} | lexicon_words)
+        self._token_rows = {token: row for row, token in enumerate(known_tokens)}
+        self._token_scores = np.vstack([self._compute_token_scores(*self._padded_features(known_tokens)),
+                                        np.zeros((1, len(reference_colors)), dtype=np.float32)])
+
+    def _token_features(self, token: str) -> Dict[int, float]:
+        features = self._features.get(token)
+        if features is None:
+            features = {}
+            for bucket, value in token_features(token).items():
+                column = bucket % self.dimensions
+                features[column] = features.get(column, 0.0) + value
+            self._features[token] = features
+        return features
+
+    def _padded_features(self, tokens: List[str]):
+        """
+        Feature columns and values of each token, one row per token, padded with zero values.
+        """
+        import numpy as np
+
+        features = [self._token_features(token) for token in tokens]
+        counts = np.array([len(token_features) for token_features in features], dtype=np.intp)
+        token_rows = np.repeat(np.arange(len(tokens)), counts)
+        positions = np.arange(len(token_rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        width = int(counts.max()) if len(tokens) else 0
+        columns = np.zeros((len(tokens), width), dtype=np.intp)
+        values = np.zeros((len(tokens), width), dtype=np.float32)
+        columns[token_rows, positions] = [column for token_features in features for column in token_features]
+        values[token_rows, positions] = [value for token_features in features for value in token_features.values()]
+        return columns, values
+
+    def _compute_token_scores(self, columns, values):
+        """
+        Dot products of the (unnormalized) token vectors, given by their padded features, with
+        every normalized reference vector. Token vectors are sparse, so this sums a few columns
+        of the reference matrix per token.
+        """
+        import numpy as np
+
+        # Tokens with the most features first, so feature k is summed over a prefix of the rows
+        # (word pairs have a single feature)
+        counts = (values != 0).sum(axis=1)
+        order = np.argsort(-counts, kind="stable")
+        columns, values, counts = columns[order], values[order], counts[order]
+        scores = np.zeros((len(columns), len(self.reference_colors)), dtype=np.float32)
+        for k in range(columns.shape[1]):
+            rows = int(np.count_nonzero(counts > k))
+            scores[:rows] += values[:rows, k, None] * self._columns[columns[:rows, k]]
+        unsorted = np.empty_like(scores)
+        unsorted[order] = scores
+        return unsorted
+
+    def vectorize(self, names: List[str], normalize: bool = True):
+        """
+        Hashed feature vectors of normalized names, one row per name (L2-normalized by default).
+        """
+        import numpy as np
+
+        rows, columns, values = [], [], []
+        for row, name in enumerate(names):
+            for token in name_tokens(name):
+                for column, value in self._token_features(token).items():
+                    rows.append(row)
+                    columns.append(column)
+                    values.append(value)
+
+        flat = np.array(rows, dtype=np.intp) * self.dimensions + np.array(columns, dtype=np.intp)
+        matrix = np.bincount(flat, weights=np.array(values, dtype=np.float64),
+                             minlength=len(names) * self.dimensions)
+        matrix = matrix.reshape(len(names), self.dimensions).astype(np.float32)
+        if normalize:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        return matrix
+
+    def search(self, color_names: List[str], top_k: int = 5, chunk_size: int = 512) -> List[List[Dict[str, object]]]:
+        """
+        Ranked candidates for each color name: [{"name", "hex", "score"}, ...], best first.
+        """
+        import numpy as np
+
+        if not self.reference_colors:
+            return [[] for _ in color_names]
+        top_k = min(top_k, len(self.reference_colors))
+
+        # Repeated names (common in target sheets) are scored once
+        normalized = [normalize_color_name(color_name) for color_name in color_names]
+        unique_names = list(dict.fromkeys(normalized))
+
+        ranked_by_name = {}
+        for start in range(0, len(unique_names), chunk_size):
+            chunk = unique_names[start:start + chunk_size]
+
+            # Each name is scored with its own tokens and its synonym variants, keeping the
+            # best score per reference color. A name's variants are listed in its row of
+            # name_variants, padded with the name itself.
+            variant_tokens, lengths, weights, name_variants = [], [], [], []
+            for name in chunk:
+                own_variants = [len(lengths)]
+                tokens = name_tokens(name)
+                variant_tokens.extend(tokens)
+                lengths.append(len(tokens))
+                weights.append(1.0)
+                if not self._synonym_words.isdisjoint(name.split()):
+                    for synonyms, weight in ((self.synonyms, SYNONYM_WEIGHT),
+                                             (self.loose_synonyms, LOOSE_SYNONYM_WEIGHT)):
+                        for variant in expand_synonyms(name, synonyms):
+                            own_variants.append(len(lengths))
+                            tokens = name_tokens(variant)
+                            variant_tokens.extend(tokens)
+                            lengths.append(len(tokens))
+                            weights.append(weight)
+                name_variants.append(own_variants)
+
+            # Tokens of the chunk and their score rows. Unknown tokens (typos, new words and word
+            # pairs) get score rows for this chunk, unless none of their features appear in the
+            # references: those score 0 everywhere, like the zero row that pads shorter variants.
+            chunk_tokens = list(dict.fromkeys(variant_tokens))
+            chunk_rows = {token: row for row, token in enumerate(chunk_tokens)}
+            columns, values = self._padded_features(chunk_tokens)
+            zero_row = len(self._token_rows)
+            score_rows = np.array([self._token_rows.get(token, zero_row) for token in chunk_tokens] + [zero_row],
+                                  dtype=np.intp)
+            token_scores = self._token_scores
+            unknown = np.array([token not in self._token_rows for token in chunk_tokens], dtype=bool)
+            if unknown.any():
+                unknown &= (self._used_columns[columns] & (values != 0)).any(axis=1)
+                unknown = np.flatnonzero(unknown)
+                token_scores = np.vstack([token_scores, self._compute_token_scores(columns[unknown], values[unknown])])
+                score_rows[unknown] = len(self._token_scores) + np.arange(len(unknown))
+            columns, values = np.pad(columns, ((0, 1), (0, 0))), np.pad(values, ((0, 1), (0, 0)))
+
+            # Chunk token rows of each variant, padded with the last row
+            lengths = np.array(lengths, dtype=np.intp)
+            width = max(int(lengths.max()), 1)
+            starts = np.cumsum(lengths) - lengths
+            positions = np.arange(len(variant_tokens)) - np.repeat(starts, lengths)
+            rows = np.full((len(lengths), width), len(chunk_tokens), dtype=np.intp)
+            rows[np.repeat(np.arange(len(lengths)), lengths), positions] = [chunk_rows[token]
+                                                                            for token in variant_tokens]
+
+            # Squared norm of a variant's vector: feature values of its tokens are summed
+            # by column, squared and added up
+            keys = (np.arange(len(lengths))[:, None, None] * self.dimensions + columns[rows]).ravel()
+            feature_values = values[rows].ravel()
+            keys, inverse = np.unique(keys[feature_values != 0], return_inverse=True)
+            summed = np.bincount(inverse, weights=feature_values[feature_values != 0], minlength=len(keys))
+            norms = np.bincount(keys // self.dimensions, weights=summed ** 2, minlength=len(lengths))
+            norms = np.sqrt(norms).astype(np.float32)
+            norms[norms == 0] = 1.0
+
+            rows = score_rows[rows]
+            scores = token_scores[rows[:, 0]]
+            for k in range(1, width):
+                scores += token_scores[rows[:, k]]
+            scores *= (np.array(weights, dtype=np.float32) / norms)[:, None]
+
+            if len(lengths) > len(chunk):
+                most_variants = max(len(own_variants) for own_variants in name_variants)
+                name_variants = np.array([own_variants + own_variants[:1] * (most_variants - len(own_variants))
+                                          for own_variants in name_variants], dtype=np.intp)
+                best = scores[name_variants[:, 0]]
+                for k in range(1, most_variants):
+                    np.maximum(best, scores[name_variants[:, k]], out=best)
+                scores = best
+
+            top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.round(np.take_along_axis(top_scores, order, axis=1).astype(np.float64), 4)
+
+            names, hexes = self._names, self._hexes
+            for name, indices, row_scores in zip(chunk, top.tolist(), top_scores.tolist()):
+                ranked_by_name[name] = [{"name": names[index], "hex": hexes[index], "score": score}
+                                        for index, score in zip(indices, row_scores)]
+        return [ranked_by_name[name] for name in normalized]
+
+def split_by_similarity(color_names: List[str], index: ColorIndex, threshold: float = 0.9,
+                        top_k: int = 5, margin: float = 0.02) -> Dict[str, Dict]:
+    """
+    Accept the colors whose best candidate scores at least threshold and more than margin above
+    the best candidate with another hex code; the others keep their candidates for the LLM prompt.
+    Returns {"matched": {name: result}, "candidates": {name: [candidate, ...]}}.
+    """
+    matched, candidates = {}, {}
+    for color_name, ranked in zip(color_names, index.search(color_names, top_k)):
+        best = ranked[0] if ranked else None
+        # Near ties between different colors are left to the LLM
+        runner_up = next((candidate for candidate in ranked if candidate["hex"] != best["hex"]), None)
+        if (best and best["score"] >= threshold
+                and (runner_up is None or best["score"] - runner_up["score"] > margin)):
+            matched[color_name] = {
+                "hex_code": best["hex"],
+                "confidence": "high",
+                "reasoning": f"local similarity match with '{best['name']}' (score {best['score']:.2f})"
+            }
+        else:
+            candidates[color_name] = [candidate for candidate in ranked if candidate["score"] > 0]
+    return {"matched": matched, "candidates": candidates}
@@ -1,9 +1,9 @@
-import requests
-
 def get_content_from_url(url: str) -> str:
     """
     Get the content of the url.
     """
+    import requests
+
     try:
         return requests.get(url).text
     except Exception as e:
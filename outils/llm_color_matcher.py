@@ -1,13 +1,16 @@
-import google.generativeai as genai
-import pandas as pd
 import os
 from typing import Dict, List, Optional, Tuple
 import json
 
+# pandas and google.generativeai are imported inside the functions that use
+# them, so importing this module (e.g. from the CLI) stays cheap.
+
 def setup_llm(api_key: str = None):
     """
     Setup the LLM with Google Gemini API.
     """
+    import google.generativeai as genai
+
     if api_key:
         genai.configure(api_key=api_key)
     else:
@@ -18,11 +21,22 @@ def setup_llm(api_key: str = None):
         else:
             raise ValueError("Google API key not found. Please set GOOGLE_API_KEY environment variable or pass it as parameter.")
 
-def create_color_matching_prompt(color_name: str, reference_colors: List[Dict[str, str]]) -> str:
+def format_candidates(candidates: List[Dict[str, object]]) -> str:
+    """
+    Format the local similarity candidates of a color for the prompt.
+    """
+    return ", ".join(f"{candidate['name']} {candidate['hex']} ({candidate['score']:.2f})" for candidate in candidates)
+
+def create_color_matching_prompt(color_name: str, reference_colors: List[Dict[str, str]],
+                                 candidates: Optional[List[Dict[str, object]]] = None) -> str:
     """
     Create a prompt for the LLM to match a color name with hex codes.
+    Candidates from the local similarity index, if given, are listed as hints.
     """
     reference_text = "\n".join([f"- {color['name']}: {color['hex']}" for color in reference_colors])
+    candidates_text = ""
+    if candidates:
+        candidates_text = f"\nMost similar reference colors (similarity score from 0 to 1): {format_candidates(candidates)}\n"
     
     prompt = f"""
 You are a color matching expert. I need you to find the best matching hex code for a color name.
@@ -31,7 +45,7 @@ Available reference colors:
 {reference_text}
 
 Target color name: "{color_name}"
-
+{candidates_text}
 Instructions:
 1. Look for exact matches first
 2. If no exact match, look for synonyms or similar color names
@@ -53,16 +67,72 @@ Examples:
 """
     return prompt
 
-def match_color_with_llm(color_name: str, reference_colors: List[Dict[str, str]], model_name: str = "gemini-1.5-flash") -> Dict[str, str]:
+def create_batch_color_matching_prompt(color_names: List[str], reference_colors: List[Dict[str, str]],
+                                       candidates: Optional[Dict[str, List[Dict[str, object]]]] = None) -> str:
+    """
+    Create a prompt for the LLM to match several color names with hex codes in one call.
+    Candidates from the local similarity index, if given, are listed as hints for each color.
+    """
+    reference_text = "\n".join([f"- {color['name']}: {color['hex']}" for color in reference_colors])
+    candidates_text = ""
+    if candidates:
+        candidates_text = "\nMost similar reference colors for each target (similarity score from 0 to 1):\n"
+        candidates_text += "\n".join(f"* {json.dumps(color_name)}: {format_candidates(candidates[color_name])}"
+                                     for color_name in color_names if candidates.get(color_name))
+        candidates_text += "\n"
+
+    prompt = f"""
+You are a color matching expert. I need you to find the best matching hex code for each color name.
+
+Available reference colors:
+{reference_text}
+
+Target color names: {json.dumps(color_names)}
+{candidates_text}
+Instructions:
+1. Look for exact matches first
+2. If no exact match, look for synonyms or similar color names
+3. Consider common color variations (e.g., "navy blue" might match "blue")
+4. If multiple matches are possible, choose the most likely one
+5. If no reasonable match is found, use "NO_MATCH"
+
+Respond with ONLY a JSON object mapping every target color name to its match, in this format:
+{{
+    "<target color name>": {{
+        "hex_code": "the_hex_code_or_NO_MATCH",
+        "confidence": "high/medium/low",
+        "reasoning": "brief explanation of why this match was chosen"
+    }}
+}}
+"""
+    return prompt
+
+def parse_llm_json(text: str):
+    """
+    Parse a JSON LLM response, removing markdown code block markers if present.
+    """
+    cleaned_response = text.strip()
+    if cleaned_response.startswith("```json"):
+        cleaned_response = cleaned_response[7:]
+    if cleaned_response.startswith("```"):
+        cleaned_response = cleaned_response[3:]
+    if cleaned_response.endswith("```"):
+        cleaned_response = cleaned_response[:-3]
+    return json.loads(cleaned_response.strip())
+
+def match_color_with_llm(color_name: str, reference_colors: List[Dict[str, str]], model_name: str = "gemini-1.5-flash",
+                         model=None, candidates: Optional[List[Dict[str, object]]] = None) -> Dict[str, str]:
     """
     Use LLM to match a color name with hex codes from reference data.
     """
+    from outils.prompt_outils import get_model
+
     try:
         # Create the prompt
-        prompt = create_color_matching_prompt(color_name, reference_colors)
+        prompt = create_color_matching_prompt(color_name, reference_colors, candidates)
         
         # Get the model
-        model = genai.GenerativeModel(model_name)
+        model = model or get_model(model_name)
         
         # Generate response
         response = model.generate_content(prompt)
@@ -87,12 +157,54 @@ def match_color_with_llm(color_name: str, reference_colors: List[Dict[str, str]]
             "reasoning": f"Error: {str(e)}"
         }
 
+def match_colors_batch_with_llm(color_names: List[str], reference_colors: List[Dict[str, str]],
+                                model_name: str = "gemini-1.5-flash", model=None,
+                                candidates: Optional[Dict[str, List[Dict[str, object]]]] = None) -> Dict[str, Dict[str, str]]:
+    """
+    Use one LLM call to match several color names with hex codes from reference data.
+    Returns a result for every color name, keyed by color name.
+    """
+    from outils.prompt_outils import get_model
+
+    try:
+        prompt = create_batch_color_matching_prompt(color_names, reference_colors, candidates)
+        model = model or get_model(model_name)
+        response = model.generate_content(prompt)
+
+        try:
+            matches = parse_llm_json(response.text)
+        except json.JSONDecodeError:
+            matches = {}
+        reasoning = "Failed to parse LLM response"
+    except Exception as e:
+        print(f"Error matching colors {color_names} with LLM: {e}")
+        matches = {}
+        reasoning = f"Error: {str(e)}"
+
+    results = {}
+    for color_name in color_names:
+        result = matches.get(color_name) if isinstance(matches, dict) else None
+        if not isinstance(result, dict) or "hex_code" not in result:
+            result = {
+                "hex_code": "NO_MATCH",
+                "confidence": "low",
+                "reasoning": reasoning if not matches else "Missing from LLM response"
+            }
+        results[color_name] = result
+    return results
+
 def read_color_reference_file(file_path: str, color_column: str = "Color", hex_column: str = "Hex") -> List[Dict[str, str]]:
     """
     Read an Excel file containing color names and their corresponding hex codes.
     Returns a list of dictionaries for LLM processing.
+    A reference compiled with compile_color_reference (.json) is loaded without pandas.
     """
+    if file_path.endswith(".json"):
+        return read_compiled_color_reference(file_path)
+
     try:
+        import pandas as pd
+
         df = pd.read_excel(file_path)
         
         reference_colors = []
@@ -112,11 +224,45 @@ def read_color_reference_file(file_path: str, color_column: str = "Color", hex_c
         print(f"Error reading color reference file: {e}")
         return []
 
+def read_compiled_color_reference(file_path: str) -> List[Dict[str, str]]:
+    """
+    Read a color reference compiled to JSON by compile_color_reference.
+    """
+    try:
+        with open(file_path, "r") as f:
+            reference_colors = json.load(f)["colors"]
+        print(f"Loaded {len(reference_colors)} color mappings from {file_path}")
+        return reference_colors
+    except Exception as e:
+        print(f"Error reading compiled color reference: {e}")
+        return []
+
+def compile_color_reference(file_path: str, output_file: str = "color_reference.json",
+                            color_column: str = "Color", hex_column: str = "Hex") -> str:
+    """
+    Compile the reference Excel file into a JSON file that loads without pandas/openpyxl.
+    """
+    reference_colors = read_color_reference_file(file_path, color_column, hex_column)
+    if not reference_colors:
+        print("Failed to read reference file. Nothing to compile.")
+        return ""
+
+    try:
+        with open(output_file, "w") as f:
+            json.dump({"source": file_path, "colors": reference_colors}, f, indent=2)
+        print(f"Compiled {len(reference_colors)} color mappings to {output_file}")
+        return output_file
+    except Exception as e:
+        print(f"Error compiling color reference: {e}")
+        return ""
+
 def read_target_document(file_path: str, color_column: str = "Color") -> List[str]:
     """
     Read the target document containing color names that need hex codes.
     """
     try:
+        import pandas as pd
+
         df = pd.read_excel(file_path)
         color_names = [str(name).strip() for name in df[color_column] if pd.notna(name)]
         print(f"Found {len(color_names)} color names in target document")
@@ -126,24 +272,16 @@ def read_target_document(file_path: str, color_column: str = "Color") -> List[st
         print(f"Error reading target document: {e}")
         return []
 
-def match_colors_with_llm_and_create_output(target_colors: List[str], reference_colors: List[Dict[str, str]], 
-                                          output_file: str = "llm_matched_colors.xlsx") -> str:
+def write_matched_colors_file(target_colors: List[str], llm_results: List[Dict[str, str]],
+                              output_file: str = "llm_matched_colors.xlsx") -> str:
     """
-    Match color names with hex codes using LLM and create output file.
+    Write the LLM results for the target colors to an Excel output file.
     """
     try:
-        print("Starting LLM-based color matching...")
-        
-        # Create output data
         output_data = []
         matches = 0
-        
-        for i, color in enumerate(target_colors, 1):
-            print(f"Processing color {i}/{len(target_colors)}: {color}")
-            
-            # Use LLM to match the color
-            llm_result = match_color_with_llm(color, reference_colors)
-            
+
+        for color, llm_result in zip(target_colors, llm_results):
             hex_code = llm_result["hex_code"] if llm_result["hex_code"] != "NO_MATCH" else ""
             confidence = llm_result.get("confidence", "unknown")
             reasoning = llm_result.get("reasoning", "")
@@ -159,6 +297,8 @@ def match_colors_with_llm_and_create_output(target_colors: List[str], reference_
             })
         
         # Create DataFrame and save to Excel
+        import pandas as pd
+
         df_output = pd.DataFrame(output_data)
         df_output.to_excel(output_file, index=False)
         
@@ -171,6 +311,34 @@ def match_colors_with_llm_and_create_output(target_colors: List[str], reference_
         print(f"Error creating output file: {e}")
         return ""
 
+def match_colors_with_llm_and_create_output(target_colors: List[str], reference_colors: List[Dict[str, str]], 
+                                          output_file: str = "llm_matched_colors.xlsx",
+                                          similarity_threshold: float = 0.9) -> str:
+    """
+    Match color names with hex codes using LLM and create output file.
+    Colors the local similarity index matches with a score of at least similarity_threshold
+    are accepted without calling the LLM; the others are sent with their candidates.
+    """
+    from outils.color_index import ColorIndex, split_by_similarity
+
+    print("Starting LLM-based color matching...")
+
+    local = split_by_similarity(target_colors, ColorIndex(reference_colors), similarity_threshold)
+    print(f"Matched {len(local['matched'])} colors locally")
+
+    llm_results = []
+    for i, color in enumerate(target_colors, 1):
+        if color in local["matched"]:
+            llm_results.append(local["matched"][color])
+            continue
+
+        print(f"Processing color {i}/{len(target_colors)}: {color}")
+
+        # Use LLM to match the color
+        llm_results.append(match_color_with_llm(color, reference_colors, candidates=local["candidates"][color]))
+
+    return write_matched_colors_file(target_colors, llm_results, output_file)
+
 def process_llm_color_matching(reference_file: str, target_file: str, output_file: str = "llm_matched_colors.xlsx",
                              color_column: str = "Color", hex_column: str = "Hex", api_key: str = None) -> str:
     """
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import json
+import re
+import statistics
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from outils.llm_color_matcher import match_colors_batch_with_llm
+
+# Long-running local service around the color matcher and the summarizer.
+# The reference colors and the model clients are loaded once, concurrent
+# color requests are batched into a single LLM call, and identical requests
+# already in flight share the same result (single-flight).
+
+class StubModel:
+    """
+    Offline stand-in for GenerativeModel, used with `ai-prompt serve --stub`.
+    Color prompts are answered by exact name lookup in the reference list of the
+    prompt, other prompts by echoing the start of the content.
+    """
+
+    class Response:
+        def __init__(self, text: str):
+            self.text = text
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def generate_content(self, prompt: str) -> "StubModel.Response":
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+        targets = re.search(r"^Target color names: (\[.*\])$", prompt, re.MULTILINE)
+        if not targets:
+            return StubModel.Response(prompt.split(": ", 1)[-1][:200])
+
+        reference = {name.strip().lower(): hex_code
+                     for name, hex_code in re.findall(r"^- (.+): (#?\w+)$", prompt, re.MULTILINE)}
+        matches = {}
+        for color_name in json.loads(targets.group(1)):
+            hex_code = reference.get(color_name.strip().lower())
+            matches[color_name] = {
+                "hex_code": hex_code or "NO_MATCH",
+                "confidence": "high" if hex_code else "low",
+                "reasoning": "exact match (stub)" if hex_code else "no exact match (stub)"
+            }
+        return StubModel.Response(json.dumps(matches))
+
+class MatchService:
+    """
+    Keeps the reference colors and model clients warm and serves match and
+    summarize requests with batching and single-flight coalescing.
+    """
+
+    def __init__(self, reference_colors: List[Dict[str, str]], get_model: Optional[Callable] = None,
+                 color_model_name: str = "gemini-1.5-flash", summary_model_name: str = "gemini-2.0-flash",
+                 batch_size: int = 16, batch_wait: float = 0.02, latency_window: int = 1000,
+                 similarity_threshold: float = 0.9):
+        from outils.color_index import ColorIndex
+
+        if get_model is None:
+            from outils.prompt_outils import get_model
+        self.reference_colors = reference_colors
+        self.index = ColorIndex(reference_colors)
+        self.similarity_threshold = similarity_threshold
+        self.get_model = get_model
+        self.color_model_name = color_model_name
+        self.summary_model_name = summary_model_name
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._batch_tasks = set()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._counters = {
+            "requests": 0,
+            "coalesced": 0,
+            "local_matches": 0,
+            "llm_calls": 0,
+            "batches": 0,
+            "batched_colors": 0,
+            "errors": 0,
+        }
+
+    async def start(self):
+        """
+        Start the background task that groups queued colors into batches.
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batches())
+
+    async def stop(self):
+        if self._batcher:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+    async def match_color(self, color_name: str) -> Dict[str, str]:
+        """
+        Match one color name; concurrent calls are sent to the LLM together.
+        Names the local similarity index matches with a high score are answered directly.
+        """
+        from outils.color_index import split_by_similarity
+
+        async def enqueue():
+            local = split_by_similarity([color_name], self.index, self.similarity_threshold)
+            if color_name in local["matched"]:
+                self._counters["local_matches"] += 1
+                return local["matched"][color_name]
+
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((color_name, local["candidates"][color_name], future))
+            return await future
+
+        return await self._single_flight(("match", color_name.strip().lower()), enqueue)
+
+    async def match_colors(self, color_names: List[str]) -> List[Dict[str, str]]:
+        return list(await asyncio.gather(*(self.match_color(name) for name in color_names)))
+
+    async def summarize(self, content: str) -> str:
+        """
+        Summarize content; identical content in flight is summarized once.
+        """
+        from outils.prompt_outils import generate_summary
+
+        async def run():
+            self._counters["llm_calls"] += 1
+            model = self.get_model(self.summary_model_name)
+            return await asyncio.to_thread(generate_summary, content, model)
+
+        key = ("summarize", hashlib.sha256(content.encode("utf-8")).hexdigest())
+        return await self._single_flight(key, run)
+
+    async def _single_flight(self, key: Tuple[str, str], run: Callable):
+        self._counters["requests"] += 1
+        start = time.perf_counter()
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self._counters["coalesced"] += 1
+            try:
+                return await asyncio.shield(future)
+            finally:
+                self._latencies.append(time.perf_counter() - start)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await run()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._counters["errors"] += 1
+            future.set_exception(e)
+            # Retrieve the exception so asyncio doesn't warn when nobody else waited
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+            self._latencies.append(time.perf_counter() - start)
+
+    async def _run_batches(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._match_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _match_batch(self, batch: List[Tuple[str, List[Dict[str, object]], asyncio.Future]]):
+        color_names = list(dict.fromkeys(color_name for color_name, _, _ in batch))
+        candidates = {color_name: color_candidates for color_name, color_candidates, _ in batch}
+        self._counters["llm_calls"] += 1
+        self._counters["batches"] += 1
+        self._counters["batched_colors"] += len(color_names)
+        try:
+            model = self.get_model(self.color_model_name)
+            results = await asyncio.to_thread(match_colors_batch_with_llm, color_names,
+                                              self.reference_colors, self.color_model_name, model, candidates)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for color_name, _, future in batch:
+            if not future.done():
+                future.set_result(results[color_name])
+
+    def metrics(self) -> Dict[str, object]:
+        """
+        Queue depth, in-flight requests, counters and latency (ms) of recent requests.
+        """
+        latencies = sorted(self._latencies)
+        latency = {"count": len(latencies)}
+        if latencies:
+            latency.update({
+                "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2),
+            })
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": len(self._in_flight),
+            "reference_colors": len(self.reference_colors),
+            **self._counters,
+            "latency": latency,
+        }
+
+def read_request_body(body: bytes) -> Dict:
+    """
+    Parse a JSON request body, which must be an object.
+    """
+    data = json.loads(body or b"{}")
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    return data
+
+def read_string_field(data: Dict, field: str) -> str:
+    value = data.get(field)
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be a string")
+    return value
+
+def read_string_list_field(data: Dict, field: str) -> List[str]:
+    value = data.get(field)
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"'{field}' must be a list of strings")
+    return value
+
+async def read_request(reader: asyncio.StreamReader) -> Tuple[List[str], bytes]:
+    """
+    Read the request line, headers and body of one HTTP request.
+    """
+    request_line = (await reader.readline()).decode("latin-1").split()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return request_line, body
+
+async def handle_http(service: MatchService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      read_timeout: float = 10.0):
+    """
+    Minimal HTTP/1.1 handler, one request per connection.
+    A request not fully received within read_timeout seconds is answered with 400.
+
+    GET  /health      -> {"status": "ok"}
+    GET  /metrics     -> service metrics
+    POST /match       -> {"color": "..."} or {"colors": [...]}
+    POST /summarize   -> {"content": "..."}
+    """
+    status, payload = 200, None
+    try:
+        request_line, body = await asyncio.wait_for(read_request(reader), read_timeout)
+
+        method, path = request_line[0], request_line[1]
+        if method == "GET" and path == "/health":
+            payload = {"status": "ok"}
+        elif method == "GET" and path == "/metrics":
+            payload = service.metrics()
+        elif method == "POST" and path == "/match":
+            data = read_request_body(body)
+            if "colors" in data:
+                payload = {"results": await service.match_colors(read_string_list_field(data, "colors"))}
+            else:
+                payload = await service.match_color(read_string_field(data, "color"))
+        elif method == "POST" and path == "/summarize":
+            data = read_request_body(body)
+            payload = {"summary": await service.summarize(read_string_field(data, "content"))}
+        else:
+            status, payload = 404, {"error": f"Unknown route: {method} {path}"}
+    except (json.JSONDecodeError, IndexError, ValueError) as e:
+        status, payload = 400, {"error": f"Bad request: {e}"}
+    except asyncio.IncompleteReadError:
+        status, payload = 400, {"error": "Bad request: body shorter than Content-Length"}
+    except asyncio.TimeoutError:
+        status, payload = 400, {"error": f"Bad request: not received within {read_timeout} s"}
+    except Exception as e:
+        status, payload = 500, {"error": str(e)}
+
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+    response_body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {reasons[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(response_body)}\r\n"
+        "Connection: close\r\n\r\n".encode("latin-1") + response_body
+    )
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def serve(service: MatchService, host: str = "127.0.0.1", port: int = 8765, read_timeout: float = 10.0):
+    """
+    Run the HTTP server until cancelled.
+    """
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: handle_http(service, r, w, read_timeout), host, port)
+    print(f"Match service listening on http://{host}:{port} "
+          f"({len(service.reference_colors)} reference colors)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
@@ -1,28 +1,42 @@
-import google.generativeai as genai
+from typing import Dict
 
-def clean_content(content: str) -> str:
+# GenerativeModel clients are cached per model name so repeated calls (and
+# the long-running match service) reuse the same client.
+_models: Dict[str, object] = {}
+
+def get_model(model_name: str = "gemini-2.0-flash"):
+    """
+    Return a cached GenerativeModel for the given model name.
+    """
+    if model_name not in _models:
+        import google.generativeai as genai
+
+        _models[model_name] = genai.GenerativeModel(model_name)
+    return _models[model_name]
+
+def clean_content(content: str, model=None) -> str:
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        model = model or get_model("gemini-2.0-flash")
         response = model.generate_content(f"Extract the text from the following HTML content and remove all the html tags and replace characters unicodes by their corresponding characters. Remove all the footer informations, header, and other informations that are not the content of the article. This is the content: {content}")
         return response.text
     except Exception as e:
         print(f"Error cleaning content: {e}")
         return content
 
-def generate_summary(content: str) -> str:
+def generate_summary(content: str, model=None) -> str:
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        model = model or get_model("gemini-2.0-flash")
         response = model.generate_content(f"Generate a summary of the following content: {content}")
         return response.text
     except Exception as e:
         print(f"Error generating summary: {e}")
         return content
 
-def format_text_to_markdown(text: str) -> str:
+def format_text_to_markdown(text: str, model=None) -> str:
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        model = model or get_model("gemini-2.0-flash")
         response = model.generate_content(f"Format the following text to a markdown format: {text}")
         return response.text
     except Exception as e:
         print(f"Error formatting text to markdown: {e}")
-        return text
\ No newline at end of file
+        return text
@@ -1,8 +1,10 @@
 # Simple runner for Step 1
 # Run this to test the basic setup
 
+import runpy
+
 print("🚀 Running Step 1: Basic Setup and Dependencies")
 print("=" * 60)
 
-# Import and run the step directly
-exec(open("step_by_step/01_basic_setup.py").read()) 
\ No newline at end of file
+# Run the step as a script, the same as `python step_by_step/01_basic_setup.py`
+runpy.run_path("step_by_step/01_basic_setup.py", run_name="__main__")